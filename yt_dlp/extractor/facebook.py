@@ -1,4 +1,7 @@
+import copy
+import functools
 import json
+import operator
 import re
 import urllib.parse
 
@@ -11,7 +14,6 @@
     determine_ext,
     float_or_none,
     format_field,
-    get_first,
     int_or_none,
     join_nonempty,
     js_to_json,
@@ -21,12 +23,102 @@
     qualities,
     str_or_none,
     traverse_obj,
+    try_call,
     try_get,
     url_or_none,
     urlencode_postdata,
     urljoin,
 )
 
+_QUOTE_RE = re.compile(r'(["\']):\s*[\[{]*\1')
+_ESCAPED_OBJ_RE = {quote: re.compile(rf'{{\\{quote}([^{quote}]+\\{quote}:)') for quote in ('"', "'")}
+
+
+def _detect_quotation(string):
+    # the quotation mark (either " or ') around the keys of a JSON string, or None if it is not one
+    if m := _QUOTE_RE.search(string):
+        return m.group(1)
+
+
+@functools.cache
+def _json_re(pattern, quote):
+    # '{Q}' in the pattern stands for the quotation mark of the JSON string to search (either " or '),
+    # so that each pattern is compiled once per quotation mark rather than on every search
+    return re.compile(pattern.replace('{Q}', quote))
+
+
+def _normalize_json_brackets(string, quote):
+    # '{}' is not an object boundary, and the opening bracket of an escaped JSON object ('{\"key\":')
+    # should match its closing bracket; the length of the string is preserved so that offsets still apply
+    return _ESCAPED_OBJ_RE[quote].sub(rf'{{{quote}\1 ', string.replace('{}', '[]'))
+
+
+# {(bracket, quote): {2-character pattern: change in the bracket balance}}; an opening bracket is followed by
+# a key, a closing bracket by a delimiter, another closing bracket or the end of a string
+_BRACKET_DELTAS = {
+    (bracket, quote): {f'{{{quote}': sign, **dict.fromkeys(('},', '}]', '}}', f'}}{quote}'), -sign)}
+    for bracket, sign in (('{', 1), ('}', -1)) for quote in ('"', "'")
+}
+
+
+def _truncate_string(string, limit=100):
+    if len(string or '') <= limit:
+        return string
+    # cut at the last space within string[47:67], or after the 46th character if there is none
+    cut = string.rfind(' ', 47, 67)
+    return string[:(cut if cut != -1 else 46)] + '...'
+
+
+def _find_json_offset(string, bracket, quote, obj_in_value=False, start=0, end=None):
+    """
+    Find the offset of the bracket enclosing a JSON object
+    @param  string          string      JSON string to search in, normalized by _normalize_json_brackets()
+            bracket         string      '{': search for the opening bracket (backward if not obj_in_value)
+                                        '}': search for the closing bracket (forward)
+            quote           string      quotation mark used in the JSON string (either " or ')
+            obj_in_value    boolean     see FacebookIE._find_json_obj()
+            start, end      int         bounds of the part of the string to search in, as in string[start:end]
+    @return                 int         offset from the start (forward) or the end (backward) of string[start:end]
+    """
+    deltas = _BRACKET_DELTAS[bracket, quote]
+    direction = 1 if bracket == '}' or obj_in_value else -1     # 1 - forward, -1 - backward
+    # searched in place rather than in a copy of string[start:end]
+    start, end, _ = slice(start, end).indices(len(string))
+    length = max(end - start, 0)
+    last = max(end - 1, 0)   # a pattern must end within the bounds, i.e. cannot start at the last character
+
+    def bracket_positions():
+        # every pattern starts with a bracket, so jump from bracket to bracket with
+        # str.find/str.rfind (C-level scans) instead of stepping through each character
+        if direction > 0:
+            o, c = string.find('{', start, last), string.find('}', start, last)
+            while o != -1 or c != -1:
+                if c == -1 or (o != -1 and o < c):
+                    yield o
+                    o = string.find('{', o + 1, last)
+                else:
+                    yield c
+                    c = string.find('}', c + 1, last)
+        else:
+            o, c = string.rfind('{', start, last), string.rfind('}', start, last)
+            while o != -1 or c != -1:
+                if o > c:
+                    yield o
+                    o = string.rfind('{', start, o)
+                else:
+                    yield c
+                    c = string.rfind('}', start, c)
+
+    b_sum = 0
+    for pos in bracket_positions():
+        delta = deltas.get(string[pos:pos + 2])
+        if delta is None:
+            continue
+        b_sum += delta
+        if b_sum >= (0 if obj_in_value else 1):
+            return (pos + 1 - start) if direction > 0 else (pos + 1 - end)
+    return length * direction
+
 
 class FacebookIE(InfoExtractor):
     _VALID_URL = r'''(?x)
@@ -468,47 +560,85 @@ class FacebookIE(InfoExtractor):
     _api_config = {
         'graphURI': '/api/graphql/',
     }
+    _LSD_RE = re.compile(r'<input type="hidden" name="lsd" value="([^"]*)"')
+    _LGNRND_RE = re.compile(r'name="lgnrnd" value="([^"]*?)"')
+    _LOGIN_FORM_RE = re.compile(r'<form(.*)name="login"(.*)</form>')
+    _LOGIN_ERROR_RE = re.compile(
+        r'(?s)<div[^>]+class=(["\']).*?login_error_box.*?\1[^>]*><div[^>]*>.*?</div><div[^>]*>(?P<error>.+?)</div>')
+    _FB_DTSG_RE = re.compile(r'name="fb_dtsg" value="(.+?)"')
+    _H_RE = re.compile(r'name="h"\s+(?:\w+="[^"]+"\s+)*?value="([^"]+)"')
+    _CHECKPOINT_BUTTON_RE = re.compile(r'id="checkpointSubmitButton"')
+    # url-encoded constant fields appended to the login and checkpoint forms
+    _LOGIN_FORM_TAIL = b'&' + urlencode_postdata({
+        'next': 'http://facebook.com/home.php',
+        'default_persistent': '0',
+        'legacy_return': '1',
+        'timezone': '-60',
+        'trynum': '1',
+    })
+    _CHECKPOINT_FORM_TAIL = b'&' + urlencode_postdata({'name_action_selected': 'dont_save'})
+    # copied by Request, so it is safe to share
+    _FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+    _TITLE_STRIP_RE = re.compile(r'<title>(Facebook(\sLive)?)|(Video)</title>')
+    _TITLE_RE = tuple(map(re.compile, (
+        r'\s<title>(?P<content>[\s\S]+?)</title>\s',
+        InfoExtractor._meta_regex('og:title'), InfoExtractor._meta_regex('twitter:title'),
+        r'<h2\s+[^>]*class="uiHeaderTitle"[^>]*>(?P<content>[^<]*)</h2>',
+        r'(?s)<span class="fbPhotosPhotoCaption".*?id="fbPhotoPageCaption"><span class="hasCaption">(?P<content>.*?)</span>')))
+    _LINE_BREAK_RE = re.compile(r'(\s*\n\s*)')
+    _VIDEO_TITLE_ID_RE = re.compile(r'(?<!^Facebook)(\SFacebook)?(?: Facebook)? Video #\d{15,}$')
+    _OG_IMAGE_EXT_RE = re.compile(r'\.(?:gif|jpg|png|webp)')
+    _THUMBNAIL_EXT_RE = re.compile(r'\.(?:jpg|png)')
+    _THUMBNAIL_HEIGHT_RE = re.compile(r'stp=.+_[a-z]\d+x(\d+)&')
+    _VIEW_COUNT_RE = (re.compile(r'\bviewCount\s*:\s*["\']([\d,.]+)'), re.compile(r'video_view_count["\']\s*:\s*(\d+)'))
+    _SERVER_JS_RE = (re.compile(r'handleServerJS\(({.+})(?:\);|,")'), re.compile(r'\bs\.handle\(({.+?})\);'))
+    _PAGELET_RE = (
+        re.compile(r'bigPipe\.onPageletArrive\(({.+?})\)\s*;\s*}\s*\)\s*,\s*["\']onPageletArrive\s+' + _SUPPORTED_PAGLETS_REGEX),
+        re.compile(rf'bigPipe\.onPageletArrive\(({{.*?id\s*:\s*"{_SUPPORTED_PAGLETS_REGEX}".*?}})\);'))
+    _PKG_COHORT_RE = re.compile(r'pkg_cohort["\']\s*:\s*["\'](.+?)["\']')
+    _CLIENT_REVISION_RE = re.compile(r'client_revision["\']\s*:\s*(\d+),')
+    _DTSG_TOKEN_RE = re.compile(r'"DTSGInitialData"\s*,\s*\[\]\s*,\s*{\s*"token"\s*:\s*"([^"]+)"')
+    _TAHOE_JS_RE = re.compile(r'for\s+\(\s*;\s*;\s*\)\s*;(.+)')
+    _INTERSTITIAL_RE = re.compile(r'class="[^"]*uiInterstitialContent[^"]*"><div>(.*?)</div>')
+    _STORY_RE = re.compile(r'"[^"]+(?<!feed)_story[^"]*":')
+    _OBJ_IN_VALUE_RE = re.compile(r'\w*(?:":)?:?\s*{')
+    _SUSPENDED_RE = re.compile(r'days left to appeal|suspended your account')
+
+    @classmethod
+    def suitable(cls, url):
+        # every supported URL contains 'facebook' (in the host or as the 'facebook:' scheme); this rejects
+        # most other URLs before the backtracking-heavy _VALID_URL is tried
+        return 'facebook' in url and super().suitable(url)
 
     def _perform_login(self, username, password):
-        login_page_req = Request(self._LOGIN_URL)
         self._set_cookie('facebook.com', 'locale', 'en_US')
-        login_page = self._download_webpage(login_page_req, None,
+        login_page = self._download_webpage(self._LOGIN_URL, None,
                                             note='Downloading login page',
                                             errnote='Unable to download login page')
-        lsd = self._search_regex(
-            r'<input type="hidden" name="lsd" value="([^"]*)"',
-            login_page, 'lsd')
-        lgnrnd = self._search_regex(r'name="lgnrnd" value="([^"]*?)"', login_page, 'lgnrnd')
+        lsd = self._search_regex(self._LSD_RE, login_page, 'lsd')
+        lgnrnd = self._search_regex(self._LGNRND_RE, login_page, 'lgnrnd')
 
         login_form = {
             'email': username,
             'pass': password,
             'lsd': lsd,
             'lgnrnd': lgnrnd,
-            'next': 'http://facebook.com/home.php',
-            'default_persistent': '0',
-            'legacy_return': '1',
-            'timezone': '-60',
-            'trynum': '1',
         }
-        request = Request(self._LOGIN_URL, urlencode_postdata(login_form))
-        request.headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request = Request(
+            self._LOGIN_URL, urlencode_postdata(login_form) + self._LOGIN_FORM_TAIL, headers=self._FORM_HEADERS)
         try:
             login_results = self._download_webpage(request, None,
                                                    note='Logging in', errnote='unable to fetch login page')
-            if re.search(r'<form(.*)name="login"(.*)</form>', login_results) is not None:
+            if self._LOGIN_FORM_RE.search(login_results) is not None:
                 error = self._html_search_regex(
-                    r'(?s)<div[^>]+class=(["\']).*?login_error_box.*?\1[^>]*><div[^>]*>.*?</div><div[^>]*>(?P<error>.+?)</div>',
-                    login_results, 'login error', default=None, group='error')
+                    self._LOGIN_ERROR_RE, login_results, 'login error', default=None, group='error')
                 if error:
                     raise ExtractorError(f'Unable to login: {error}', expected=True)
                 self.report_warning('unable to log in: bad username/password, or exceeded login rate limit (~3/min). Check credentials or wait.')
                 return
 
-            fb_dtsg = self._search_regex(
-                r'name="fb_dtsg" value="(.+?)"', login_results, 'fb_dtsg', default=None)
-            h = self._search_regex(
-                r'name="h"\s+(?:\w+="[^"]+"\s+)*?value="([^"]+)"', login_results, 'h', default=None)
+            fb_dtsg = self._search_regex(self._FB_DTSG_RE, login_results, 'fb_dtsg', default=None)
+            h = self._search_regex(self._H_RE, login_results, 'h', default=None)
 
             if not fb_dtsg or not h:
                 return
@@ -516,122 +646,201 @@ def _perform_login(self, username, password):
             check_form = {
                 'fb_dtsg': fb_dtsg,
                 'h': h,
-                'name_action_selected': 'dont_save',
             }
-            check_req = Request(self._CHECKPOINT_URL, urlencode_postdata(check_form))
-            check_req.headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            check_req = Request(
+                self._CHECKPOINT_URL, urlencode_postdata(check_form) + self._CHECKPOINT_FORM_TAIL,
+                headers=self._FORM_HEADERS)
             check_response = self._download_webpage(check_req, None,
                                                     note='Confirming login')
-            if re.search(r'id="checkpointSubmitButton"', check_response) is not None:
+            if self._CHECKPOINT_BUTTON_RE.search(check_response) is not None:
                 self.report_warning('Unable to confirm login, you have to login in your browser and authorize the login.')
         except network_exceptions as err:
             self.report_warning(f'unable to log in: {err}')
             return
 
+    @staticmethod
+    def _yield_sjs_data(webpage):
+        # plain substring search; a lazy regex over the whole (multi-MB) webpage is much slower
+        end = 0
+        while (start := webpage.find('data-sjs>{', end)) != -1:
+            start += len('data-sjs>')
+            if (end := webpage.find('</script>', start)) == -1:
+                break
+            if webpage[end - 1] == '}' and webpage.find('ScheduledServerJS', start, end) != -1:
+                yield webpage[start:end]
+
+    @classmethod
+    def _find_json_obj(cls, json_str_info, json_strings, *patterns, obj_in_value=False, get_all=False):
+        """
+        Find JSON object, in the form of a string, by regular expression
+        >>> obj = cls._find_json_obj({}, [json_a, _and_b], regex_a, (regex_b, _or_c), obj_in_value=False, get_all=True)
+        @param  json_str_info   dict            {JSON string: (quotation mark, normalized JSON string)}, filled in
+                                                as the strings are searched, so that they can be shared between calls
+                json_strings    string/list     JSON string/a list of JSON strings (match all)
+                *patterns       string/tuple    regex patterns, as strings or compiled
+                                                (if tuple, return only the 1st matched pattern)
+                obj_in_value    boolean         False:  find the object(s) containing (one of) the pattern(s)
+                                                True :  given pattern(s) of the key(s) to find the
+                                                        object(s) in the value of that key(s)
+                get_all         boolean         return the 1st or all of the results of each regex pattern
+        @return                 list of tuple   a list of (matching pattern, matched JSON object)
+        """
+        # the argument types are resolved once here, so that the loops below only handle lists of strings
+        # and compiled patterns
+        json_strings = [x for x in (json_strings if isinstance(json_strings, list) else [json_strings])
+                        if isinstance(x, str)]
+        patterns = [[re.compile(x) for x in (item if isinstance(item, tuple) else [item])
+                     if isinstance(x, (str, re.Pattern))]
+                    for item in patterns]
+        for json_str in json_strings:   # loop all
+            if json_str not in json_str_info:
+                # check if json_str is a JSON string and get the quotation mark (either " or ')
+                quote = _detect_quotation(json_str)
+                json_str_info[json_str] = (quote, quote and _normalize_json_brackets(json_str, quote))
+            quote, normalized_str = json_str_info[json_str]
+            if quote:
+                for patterns_item in patterns:
+                    for pattern in patterns_item:
+                        # 'patterns_item' loop - loop the pattern(s) of each item in *patterns
+                        found = False
+                        for m in pattern.finditer(json_str):    # break according to get_all
+                            if obj_in_value:
+                                i = (lambda x, y: (m.start(m.lastindex or 0) + x - 1) if x > 0
+                                     else ((m.end(m.lastindex or 0) + len(y.group(0)) - 1) if y else None)
+                                     )(m.group(m.lastindex or 0).rfind('{'),
+                                       cls._OBJ_IN_VALUE_RE.match(json_str, m.end(m.lastindex or 0)))
+                            else:
+                                i = m.start(m.lastindex or 0)
+                            if i:
+                                opening = (i + _find_json_offset(
+                                    normalized_str, '{', quote, obj_in_value,
+                                    i * obj_in_value, i * (not obj_in_value) - obj_in_value * 2 + 1,
+                                ) - obj_in_value)
+                                closing = i + _find_json_offset(normalized_str, '}', quote, obj_in_value, i)
+                                if isinstance(opening, int) and isinstance(closing, int):
+                                    found = True
+                                    yield (m.group(0), json_str[opening:closing])
+                                    if not get_all:
+                                        break
+                        else:   # if this for loop ends with break (i.e. not get_all), else clause is not executed
+                            if found:
+                                break   # break 'patterns_item' loop if found and get_all
+                            continue    # move on to the next 'pattern' (if exists) in 'patterns_item' if not found
+                        break           # break 'patterns_item' loop if found and not get_all
+
+    def _extract_dash_manifest(self, video, formats, subtitles, manifests=None):
+        """@param manifests  {(manifest, MPD URL): (formats, subtitles)}, so that a manifest is parsed only once"""
+        dash_manifest = traverse_obj(video, 'playlist', 'dash_manifest', expected_type=str)
+        if dash_manifest:
+            key = (dash_manifest, video.get('dash_manifest_url'))
+            # copied since the formats are modified afterwards
+            if manifests is not None and key in manifests:
+                dash_fmts, dash_subs = copy.deepcopy(manifests[key])
+            else:
+                dash_fmts, dash_subs = self._parse_mpd_formats_and_subtitles(
+                    compat_etree_fromstring(urllib.parse.unquote_plus(dash_manifest)), mpd_url=key[1])
+                if manifests is not None:
+                    manifests[key] = copy.deepcopy((dash_fmts, dash_subs))
+            formats.extend(dash_fmts)
+            self._merge_subtitles(dash_subs, target=subtitles)
+        return formats, subtitles
+
+    @staticmethod
+    def _process_formats(info):
+        for f in info['formats']:
+            # Downloads with browser's User-Agent are rate limited. Working around
+            # with non-browser User-Agent.
+            f.setdefault('http_headers', {})['User-Agent'] = 'facebookexternalhit/1.1'
+            # Formats larger than ~500MB will return error 403 unless chunk size is regulated
+            f.setdefault('downloader_options', {})['http_chunk_size'] = 250 << 20
+
+    @staticmethod
+    def _extract_video_data(instances):
+        video_data = []
+        for item in instances:
+            if try_get(item, lambda x: x[1][0]) == 'VideoConfig':
+                video_item = item[2][0]
+                if video_item.get('video_id'):
+                    video_data.append(video_item['videoData'])
+        return video_data
+
+    def _extract_from_jsmods_instances(self, js_data):
+        if js_data:
+            return self._extract_video_data(try_get(
+                js_data, lambda x: x['jsmods']['instances'], list) or [])
+
     def _real_extract(self, url):
         video_id = self._match_id(url)
         url = self._VIDEO_PAGE_TEMPLATE % video_id if url.startswith('facebook:') else url
-        webpage = self._download_webpage(
-            re.sub(r'://(?:[\w-]+\.)?facebook\.com/', '://www.facebook.com/', url), video_id)
+        url_parts = urllib.parse.urlsplit(url)
+        # facebook.com and its single-level subdomains (m., web., ...) are fetched from www.facebook.com
+        if url_parts.netloc != 'www.facebook.com' and 'facebook.com' in (
+                url_parts.netloc, url_parts.netloc.partition('.')[2]):
+            url_parts = url_parts._replace(netloc='www.facebook.com')
+        webpage = self._download_webpage(url_parts.geturl(), video_id)
+
+        # identical scripts carry nothing new, so each is kept (and parsed or searched) only once
+        post_data = list(dict.fromkeys(self._yield_sjs_data(webpage)))
+        # {index in post_data: __bbox objects}; a script is parsed only when a lookup needs it
+        bbox_data = {}
+
+        def get_bbox_first(markers, path, default=None):
+            # a script can only match if one of the markers appears in it, so the others are not parsed
+            for i, sjs in enumerate(post_data):
+                if not any(marker in sjs for marker in markers):
+                    continue
+                if i not in bbox_data:
+                    bbox_data[i] = traverse_obj(self._parse_json(sjs, video_id, fatal=False),
+                                                ('require', ..., ..., ..., '__bbox'), default=[])
+                for bbox in bbox_data[i]:
+                    if (result := traverse_obj(bbox, path, get_all=False)) is not None:
+                        return result
+            return default
 
-        post_data = re.findall(r'data-sjs>({.*?ScheduledServerJS.*?})</script>', webpage)
-        sjs_data = [self._parse_json(j, video_id, fatal=False) for j in post_data]
         cookies = self._get_cookies(url)
         # user passed logged-in cookies or attempted to login
         login_data = cookies.get('c_user') and cookies.get('xs')
         logged_in = False
-        if login_data:
-            logged_in = get_first(sjs_data, (
-                'require', ..., ..., ..., '__bbox', 'define',
-                lambda _, v: 'CurrentUserInitialData' in v, ..., 'ACCOUNT_ID'), default='0') != '0'
-            if logged_in and (info := get_first(sjs_data, (
-                'require', ..., ..., ..., '__bbox', 'require', ..., ..., ..., '__bbox', 'result', 'data',
+        # a c_user cookie without a user id cannot be from a logged-in session, so SJS need not be checked
+        if login_data and cookies['c_user'].value not in ('', '0'):
+            logged_in = get_bbox_first(('CurrentUserInitialData',), (
+                'define', lambda _, v: 'CurrentUserInitialData' in v, ..., 'ACCOUNT_ID'), default='0') != '0'
+            if logged_in and (info := get_bbox_first(('ufac_client', 'epsilon_checkpoint'), (
+                'require', ..., ..., ..., '__bbox', 'result', 'data',
                 (('ufac_client', 'state', (('set_contact_point_state_renderer', 'title'),
                                            ('intro_state_renderer', 'header_title'))),
                  ('epsilon_checkpoint', 'screen', 'title')),
             ))):
-                if any(content in info for content in ['days left to appeal', 'suspended your account']):
+                if self._SUSPENDED_RE.search(info):
                     raise ExtractorError('Your account is suspended', expected=True)
                 if 'Enter mobile number' == info:
                     raise ExtractorError('Facebook is requiring mobile number confirmation', expected=True)
                 if 'your account has been locked' in info:
                     raise ExtractorError('Your account has been locked', expected=True)
 
-        if props := get_first(sjs_data, (
-                'require', ..., ..., ..., '__bbox', 'require', ..., ..., ..., (None, (..., ...)), 'rootView',
+        if props := get_bbox_first(('rootView',), (
+                'require', ..., ..., ..., (None, (..., ...)), 'rootView',
                 lambda _, v: v.get('title') is not None)):
             if not self._cookies_passed:
                 self.raise_login_required()
             else:
-                msg = re.sub(r'\s{2,}', ' ', join_nonempty('title', 'body', delim='. ', from_dict=props))
+                msg = ' '.join(join_nonempty('title', 'body', delim='. ', from_dict=props).split())
                 raise ExtractorError(f'This video is not available. Facebook said: {msg}', expected=True)
 
-        if post_data and not re.search(r'"[^"]+[^(feed)]_story[^"]*":', ','.join(post_data)):
+        if post_data and not any(self._STORY_RE.search(p_data) for p_data in post_data):
             raise ExtractorError('An unknown error occurred. Please try again.', expected=True)
 
-        def find_json_obj(json_strings, *patterns, obj_in_value=False, get_all=False):
-            """
-            Find JSON object, in the form of a string, by regular expression
-            >>> obj = find_json_obj([json_a, _and_b], regex_a, (regex_b, _or_c), obj_in_value=False, get_all=True)
-            @param  json_strings    string/list     JSON string/a list of JSON strings (match all)
-                    *patterns       string/tuple    regex patterns (if tuple, return only the 1st matched pattern)
-                    obj_in_value    boolean         False:  find the object(s) containing (one of) the pattern(s)
-                                                    True :  given pattern(s) of the key(s) to find the
-                                                            object(s) in the value of that key(s)
-                    get_all         boolean         return the 1st or all of the results of each regex pattern
-            @return                 list of tuple   a list of (matching pattern, matched JSON object)
-            """
-            def find_offset(string, bracket, quote):
-                _BRACKET_MAP = {
-                    '{': ([f'{{{quote}'], ['},', '}]', '}}', f'}}{quote}'], (1 if obj_in_value else -1)),
-                    '}': (['},', '}]', '}}', f'}}{quote}'], [f'{{{quote}'], 1),
-                }      # ([search pattern], [opposite sign], search direction); search direction: 1 - forward, -1 - backward
-                string = re.sub(rf'{{\\{quote}([^{quote}]+\\{quote}:)', rf'{{{quote}\1 ', string.replace('{}', '[]'))
-                count, b_sum, offset = 0, 0, 0
-                for y, x in zip(((string[1:] + ' ') if _BRACKET_MAP[bracket][2] > 0 else (' ' + string[:-1]))[::_BRACKET_MAP[bracket][2]],
-                                string[::_BRACKET_MAP[bracket][2]]):
-                    s = (x + y) if _BRACKET_MAP[bracket][2] > 0 else (y + x)
-                    count += (1 if s in _BRACKET_MAP[bracket][0] or s in _BRACKET_MAP[bracket][1] else 0)
-                    b_sum += (1 if s in _BRACKET_MAP[bracket][0] else (-1 if s in _BRACKET_MAP[bracket][1] else 0))
-                    offset += 1
-                    if count > 0 and b_sum >= (0 if obj_in_value else 1):
-                        break
-                return offset * _BRACKET_MAP[bracket][2]
-
-            for json_str in (json_strings if isinstance(json_strings, list) else [json_strings]):   # loop all
-                if isinstance(json_str, str):
-                    # check if json_str is a JSON string and get the quotation mark (either " or ')
-                    if quote := (lambda x: x.group(1) if x else None)(re.search(r'(["\']):\s*[\[{]*\1', json_str)):
-                        for patterns_item in patterns:
-                            for pattern in (patterns_item if isinstance(patterns_item, tuple) else [patterns_item]):
-                                # 'patterns_item' loop - loop each item in *patterns (item can be a str or tuple)
-                                found = False
-                                if isinstance(pattern, str):
-                                    for m in re.finditer(pattern, json_str):    # break according to get_all
-                                        if obj_in_value:
-                                            i = (lambda x, y: (m.start(m.lastindex or 0) + x - 1) if x > 0
-                                                 else ((m.end(m.lastindex or 0) + len(y.group(0)) - 1) if y else None)
-                                                 )(m.group(m.lastindex or 0).rfind('{'),
-                                                   re.match(r'^\w*(?:":)?:?\s*{', json_str[m.end(m.lastindex or 0):]))
-                                        else:
-                                            i = m.start(m.lastindex or 0)
-                                        if i:
-                                            opening = (i + find_offset(
-                                                json_str[(i * obj_in_value):(i * (not obj_in_value) - obj_in_value * 2 + 1)], '{', quote,
-                                            ) - obj_in_value)
-                                            closing = i + find_offset(json_str[i:], '}', quote)
-                                            if isinstance(opening, int) and isinstance(closing, int):
-                                                found = True
-                                                yield (m.group(0), json_str[opening:closing])
-                                                if not get_all:
-                                                    break
-                                    else:   # if this for loop ends with break (i.e. not get_all), else clause is not executed
-                                        if found:
-                                            break   # break 'patterns_item' loop if found and get_all
-                                        continue    # move on to the next 'pattern' (if exists) in 'patterns_item' if not found
-                                    break           # break 'patterns_item' loop if found and not get_all
-                                if found and isinstance(patterns_item, tuple):
-                                    break           # break 'patterns_item' loop if found and patterns_item is a tuple
+        # the quotation marks and normalized JSON strings are shared by all find_json_obj() calls
+        # since they search the same strings
+        find_json_obj = functools.partial(self._find_json_obj, {})
+
+        # {JSON object string: parsed object}; several find_json_obj() calls may find the same objects
+        parsed_json_objs = {}
+
+        def parse_json_obj(json_obj):
+            if json_obj not in parsed_json_objs:
+                parsed_json_objs[json_obj] = json.loads(json_obj)
+            return parsed_json_objs[json_obj]
 
         def extract_metadata(field=None):
             if webpage_info.get(field) is not None:
@@ -642,11 +851,12 @@ def extract_metadata(field=None):
             description = title = timestamp = uploader_info = None
             # uploader
             if field == 'uploader':
-                for x in find_json_obj(post_data, (rf'actors{Q}:[^}}]+{Q}__isActor{Q}:',
-                                                   rf'owner{Q}:[^}}]+{Q}name{Q}:\s*{Q}[^{Q}]'),
+                id_re = re.compile(rf'id{Q}:\s*{Q}{s_id}{Q}')
+                for x in find_json_obj(post_data, (_json_re(r'actors{Q}:[^}]+{Q}__isActor{Q}:', Q),
+                                                   _json_re(r'owner{Q}:[^}]+{Q}name{Q}:\s*{Q}[^{Q}]', Q)),
                                        get_all=True):
-                    if re.search(rf'id{Q}:\s*{Q}{s_id}{Q}', x[1]):
-                        uploader_info = traverse_obj(json.loads(x[1]), {
+                    if id_re.search(x[1]):
+                        uploader_info = traverse_obj(parse_json_obj(x[1]), {
                             'uploader': ((('actors', ...), 'owner', ('owner', 'owner_as_page')), 'name', {str}),
                             'uploader_id': ((('actors', ...), 'owner', ('owner', 'owner_as_page')), 'id', {str}),
                             'uploader_url': ((('actors', ...), 'owner', ('owner', 'owner_as_page')), 'url', {url_or_none}),
@@ -656,16 +866,17 @@ def extract_metadata(field=None):
                     webpage_info.update(uploader_info)
             # title / description
             if field in ('title', 'description', None):
-                for x in find_json_obj(post_data,
-                                       rf'{Q}message{Q}:(?:(?!{Q}message{Q}:)[^}}])+{Q}text{Q}:\s*{Q}[^{Q}](?:(?!{Q}id{Q}:).)+{Q}id{Q}:',
-                                       get_all=True):
-                    x_dict = json.loads(x[1])
-                    for i in [i for i in [s_id, p_id] if i is not None]:
+                ids = tuple(i for i in (s_id, p_id) if i is not None)
+                for x in find_json_obj(post_data, _json_re(
+                        r'{Q}message{Q}:(?:(?!{Q}message{Q}:)[^}])+{Q}text{Q}:\s*{Q}[^{Q}](?:(?!{Q}id{Q}:).)+{Q}id{Q}:', Q),
+                        get_all=True):
+                    x_dict = parse_json_obj(x[1])
+                    for i in ids:
                         if x_dict.get('id') == i:
                             if (description := x_dict['message'] if isinstance(x_dict['message'], str)
                                     else traverse_obj(x_dict, ('message', 'text', {str_or_none}))):
                                 if (track_title := (lambda x: x.group(0) if x else None
-                                                    )(re.search(rf'{Q}track_title{Q}:\s*{Q}((?:[^{Q}\\]|\\.)*){Q}', x[1]))):
+                                                    )(_json_re(r'{Q}track_title{Q}:\s*{Q}((?:[^{Q}\\]|\\.)*){Q}', Q).search(x[1]))):
                                     description += '. ' + json.loads('{' + track_title + '}')['track_title']
                                 break
                     if description:
@@ -673,8 +884,8 @@ def extract_metadata(field=None):
                 description = description or self._html_search_meta(
                     ['description', 'og:description', 'twitter:description'],
                     webpage, 'description', default='')
-                for x in find_json_obj(post_data, rf'title{Q}:\s*[^}}]+{Q}text{Q}:\s*{Q}[^{Q}]', get_all=True):
-                    x_dict = json.loads(x[1])
+                for x in find_json_obj(post_data, _json_re(r'title{Q}:\s*[^}]+{Q}text{Q}:\s*{Q}[^{Q}]', Q), get_all=True):
+                    x_dict = parse_json_obj(x[1])
                     if p_id:
                         if (text := traverse_obj(x_dict, ('title', 'text', {str_or_none}))):
                             title = title or (text if x_dict.get('id') == p_id else None)
@@ -684,26 +895,24 @@ def extract_metadata(field=None):
                 title = (lambda x: x if x != extract_metadata('uploader') else None
                          )(title
                            or (self._html_search_regex(
-                               (r'\s<title>(?P<content>[\s\S]+?)</title>\s',
-                                self._meta_regex('og:title'), self._meta_regex('twitter:title'),
-                                r'<h2\s+[^>]*class="uiHeaderTitle"[^>]*>(?P<content>[^<]*)</h2>',
-                                r'(?s)<span class="fbPhotosPhotoCaption".*?id="fbPhotoPageCaption"><span class="hasCaption">(?P<content>.*?)</span>'),
-                               re.sub(r'<title>(Facebook(\sLive)?)|(Video)</title>', '', webpage),
-                               'title', default='', group='content')
+                               self._TITLE_RE, self._TITLE_STRIP_RE.sub('', webpage), 'title', default='', group='content')
                                or (lambda x: '' if not x or x.group(1) in ('Video', 'Facebook', 'Facebook Live')
                                    else x.group(1).encode().decode('unicode_escape')
-                                   )(re.search(rf'{Q}meta{Q}:\s*{{{Q}title{Q}:\s*{Q}((?:[^{Q}\\]|\\.)*){Q}', webpage))
+                                   )(_json_re(r'{Q}meta{Q}:\s*{{Q}title{Q}:\s*{Q}((?:[^{Q}\\]|\\.)*){Q}', Q).search(webpage))
                                ).split(' | ')[0]
-                           or re.sub(r'(\s*\n\s*)', ' ', description))
-                webpage_info['title'] = title if len(title or '') <= 100 else title[:(47 + title[47:67].rfind(' '))] + '...'
+                           or self._LINE_BREAK_RE.sub(' ', description))
+                webpage_info['title'] = _truncate_string(title)
                 webpage_info['description'] = description
             # timestamp
             if field in ('timestamp', None):
+                id_re = re.compile(rf'id{Q}:\s*{Q}(?:(?:{s_id})|(?:{p_id})){Q}')
                 for x in find_json_obj(post_data,
-                                       rf'creation_time{Q}:\s*\d+,', rf'created_time{Q}:\s*\d+,', rf'publish_time{Q}:\s*\d+,',
+                                       _json_re(r'creation_time{Q}:\s*\d+,', Q),
+                                       _json_re(r'created_time{Q}:\s*\d+,', Q),
+                                       _json_re(r'publish_time{Q}:\s*\d+,', Q),
                                        get_all=True):
-                    if re.search(rf'id{Q}:\s*{Q}(?:(?:{s_id})|(?:{p_id})){Q}', x[1]):
-                        if timestamp := json.loads(x[1]).get(re.split(f'{Q}', x[0])[0]):
+                    if id_re.search(x[1]):
+                        if timestamp := parse_json_obj(x[1]).get(x[0].split(Q)[0]):
                             break
                 webpage_info['timestamp'] = timestamp
             # return data
@@ -711,77 +920,77 @@ def extract_metadata(field=None):
 
         thumbnail = self._html_search_meta(
             ['og:image', 'twitter:image'], webpage, 'thumbnail', default=None)
-        if thumbnail and not re.search(r'\.(?:gif|jpg|png|webp)', thumbnail):
+        if thumbnail and not self._OG_IMAGE_EXT_RE.search(thumbnail):
             thumbnail = None
 
         webpage_info = {
             'thumbnails': [{k: v for k, v in {
                 'url': thumbnail,
                 'height': (lambda x: int_or_none(x.group(1)) if x else None
-                           )(re.search(r'stp=.+_[a-z]\d+x(\d+)&', thumbnail)),
+                           )(self._THUMBNAIL_HEIGHT_RE.search(thumbnail)),
                 'preference': None if 'stp=' in thumbnail else 1,
             }.items() if v is not None}] if url_or_none(thumbnail) else [],
-            'view_count': parse_count(self._search_regex(
-                (r'\bviewCount\s*:\s*["\']([\d,.]+)', r'video_view_count["\']\s*:\s*(\d+)'),
-                webpage, 'view count', default=None)),
+            'view_count': parse_count(self._search_regex(self._VIEW_COUNT_RE, webpage, 'view count', default=None)),
         }
 
         p_id, s_id, linked_url, data = None, None, None, []
-        Q = (lambda x: x.group(1) if x else '"')(re.search(r'(["\']):\s*[\[{]*\1', (post_data[0] if post_data else '')))
-        for p_data in post_data[:]:
-            if rf'{Q}feed_unit{Q}:' in p_data or not re.search(rf'{Q}(?:dash_manifest_url|message){Q}:', p_data):
-                # discard useless data
-                post_data.remove(p_data)
-            else:
-                if (not s_id or not p_id) and (f'{Q}story{Q}:' in p_data or f'{Q}creation_story{Q}:' in p_data):
-                    p_id = p_id if p_id else (lambda x: x.group(1) if x else
-                                              (video_id if video_id.isnumeric() else None)
-                                              )(re.search(rf'{Q}(?:post_id|videoId|video_id){Q}:\s*{Q}(\d+){Q}', p_data))
-                    s_id = s_id if s_id else (lambda x: x.group(1) if x else None
-                                              )(re.search(rf'id{Q}:\s*{Q}(Uzpf[^{Q}]+){Q}', p_data))
-                if not data:
-                    if re.search(rf'{Q}attachment{Q}:\s*{{{Q}(?:source|web_link){Q}:', p_data):
-                        # linked video
-                        for x in find_json_obj(p_data, rf'{Q}attachment{Q}:\s*{{{Q}(?:source|web_link){Q}:', obj_in_value=True):
-                            if linked_url := traverse_obj(
-                                    json.loads(x[1]), (('web_link', None), 'url', {url_or_none}), get_all=False):
-                                url_transparent = '.facebook.com' not in urllib.parse.urlparse(linked_url).netloc
-                                data = x[1]
-                                break
-                    elif f'{Q}dash_manifest_url{Q}:' in p_data[:p_data.find(f'{Q}comment_list_renderer{Q}:')]:
-                        for x in find_json_obj(p_data, rf'{Q}data{Q}:\s*{{', rf'{Q}data{Q}:', obj_in_value=True):
-                            if f'{Q}dash_manifest_url{Q}:' in x[1]:
-                                data = x[1]
-                                break
+        Q = _detect_quotation(post_data[0] if post_data else '') or '"'
+        # the markers and patterns below are built once rather than for every SJS string
+        feed_unit, dash_manifest_url, message = f'{Q}feed_unit{Q}:', f'{Q}dash_manifest_url{Q}:', f'{Q}message{Q}:'
+        stories = (f'{Q}story{Q}:', f'{Q}creation_story{Q}:')
+        comment_list_renderer = f'{Q}comment_list_renderer{Q}:'
+        p_id_re = _json_re(r'{Q}(?:post_id|videoId|video_id){Q}:\s*{Q}(\d+){Q}', Q)
+        s_id_re = _json_re(r'id{Q}:\s*{Q}(Uzpf[^{Q}]+){Q}', Q)
+        attachment_re = _json_re(r'{Q}attachment{Q}:\s*{{Q}(?:source|web_link){Q}:', Q)
+        # discard useless data
+        post_data = [p_data for p_data in post_data if feed_unit not in p_data
+                     and (dash_manifest_url in p_data or message in p_data)]
+        for p_data in post_data:
+            if (not s_id or not p_id) and any(story in p_data for story in stories):
+                p_id = p_id if p_id else (lambda x: x.group(1) if x else
+                                          (video_id if video_id.isnumeric() else None)
+                                          )(p_id_re.search(p_data))
+                s_id = s_id if s_id else (lambda x: x.group(1) if x else None
+                                          )(s_id_re.search(p_data))
+            if not data:
+                if attachment_re.search(p_data):
+                    # linked video
+                    for x in find_json_obj(p_data, attachment_re, obj_in_value=True):
+                        if linked_url := traverse_obj(
+                                parse_json_obj(x[1]), (('web_link', None), 'url', {url_or_none}), get_all=False):
+                            url_transparent = '.facebook.com' not in urllib.parse.urlparse(linked_url).netloc
+                            data = x[1]
+                            break
+                elif p_data.find(dash_manifest_url, 0, p_data.find(comment_list_renderer)) != -1:
+                    for x in find_json_obj(p_data, _json_re(r'{Q}data{Q}:\s*{', Q), _json_re(r'{Q}data{Q}:', Q),
+                                           obj_in_value=True):
+                        if dash_manifest_url in x[1]:
+                            data = x[1]
+                            break
+            if data and s_id and p_id:
+                break   # nothing left to find
 
         if linked_url:
             return self.url_result(linked_url, video_id=video_id, url_transparent=url_transparent,
                                    **{k: v for k, v in (extract_metadata() if url_transparent else {}).items() if v})
 
-        def extract_dash_manifest(video, formats=[], subtitles={}):
-            dash_manifest = traverse_obj(video, 'playlist', 'dash_manifest', expected_type=str)
-            if dash_manifest:
-                dash_fmts, dash_subs = self._parse_mpd_formats_and_subtitles(
-                    compat_etree_fromstring(urllib.parse.unquote_plus(dash_manifest)),
-                    mpd_url=video.get('dash_manifest_url'))
-                formats.extend(dash_fmts)
-                self._merge_subtitles(dash_subs, target=subtitles)
-            return formats, subtitles
-
-        def process_formats(info):
-            for f in info['formats']:
-                # Downloads with browser's User-Agent are rate limited. Working around
-                # with non-browser User-Agent.
-                f.setdefault('http_headers', {})['User-Agent'] = 'facebookexternalhit/1.1'
-                # Formats larger than ~500MB will return error 403 unless chunk size is regulated
-                f.setdefault('downloader_options', {})['http_chunk_size'] = 250 << 20
+        # {MPD URL: (formats, subtitles)}; a manifest is often listed under several keys or by several videos
+        mpd_data = {}
+        # the same for manifests embedded in the video data, see _extract_dash_manifest()
+        dash_manifests = {}
+
+        def extract_mpd_formats_and_subtitles(mpd_url):
+            if mpd_url not in mpd_data:
+                mpd_data[mpd_url] = self._extract_mpd_formats_and_subtitles(mpd_url, video_id)
+            # copied since the formats are modified afterwards
+            return copy.deepcopy(mpd_data[mpd_url])
 
         if data:
             def parse_graphql_video(video):
                 v_id = video.get('videoId') or video.get('id') or video_id
                 formats = []
                 captions, subtitles = {}, {}
-                is_broadcast = traverse_obj(video, ('is_video_broadcast', {bool}))
+                is_broadcast = video.get('is_video_broadcast') is True
                 for key, format_id in (('playable_url', 'sd'), ('playable_url_quality_hd', 'hd'),
                                        ('playable_url_dash', ''), ('browser_native_hd_url', 'hd'),
                                        ('browser_native_sd_url', 'sd')):
@@ -789,7 +998,7 @@ def parse_graphql_video(video):
                     if not playable_url:
                         continue
                     if determine_ext(playable_url) == 'mpd':
-                        dash_fmts, dash_subs = self._extract_mpd_formats_and_subtitles(playable_url, video_id)
+                        dash_fmts, dash_subs = extract_mpd_formats_and_subtitles(playable_url)
                         formats.extend(dash_fmts)
                         self._merge_subtitles(dash_subs, target=(captions if is_broadcast else subtitles))
                     else:
@@ -801,16 +1010,15 @@ def parse_graphql_video(video):
                             'url': playable_url,
                         })
                 if is_broadcast:
-                    formats, captions = extract_dash_manifest(video, formats, captions)
+                    formats, captions = self._extract_dash_manifest(video, formats, captions, dash_manifests)
                 else:
-                    formats, subtitles = extract_dash_manifest(video, formats, subtitles)
+                    formats, subtitles = self._extract_dash_manifest(video, formats, subtitles, dash_manifests)
 
                 # captions/subtitles
-                for caption in traverse_obj(video, (
-                    'video_available_captions_locales',
-                    {lambda x: sorted(x, key=lambda c: c['locale'])},
-                    lambda _, v: url_or_none(v['captions_url']),
-                )):
+                for caption in try_call(sorted, args=(video.get('video_available_captions_locales'),),
+                                        kwargs={'key': operator.itemgetter('locale')}) or []:
+                    if not url_or_none(caption.get('captions_url')):
+                        continue
                     lang = caption.get('localized_language') or 'und'
                     subs = {
                         'url': caption['captions_url'],
@@ -820,49 +1028,54 @@ def parse_graphql_video(video):
                         captions.setdefault(caption['locale'], []).append(subs)
                     else:
                         subtitles.setdefault(caption['locale'], []).append(subs)
-                captions_url = traverse_obj(video, ('captions_url', {url_or_none}))
+                captions_url = url_or_none(video.get('captions_url'))
                 if captions_url and not captions and not subtitles:
                     locale = self._html_search_meta(
                         ['og:locale', 'twitter:locale'], webpage, 'locale', default='en_US')
                     (captions if is_broadcast else subtitles)[locale] = [{'url': captions_url}]
                 # thumbnails
-                thumbnails = []
+                thumbnails, thumbnail_ids = [], set()
                 for url in [uri for uri in [traverse_obj(video, path) for path in [
                     ('thumbnailImage', 'uri'), ('preferred_thumbnail', 'image', 'uri'),
                     ('image', 'uri'), ('previewImage', 'uri'),
                 ]] if url_or_none(uri) is not None]:
-                    if (re.search(r'\.(?:jpg|png)', url)
-                            and not any(url.split('_cat=')[0] in t['url'] for t in thumbnails)):
+                    # the same image in other sizes only differs after '_cat='
+                    if self._THUMBNAIL_EXT_RE.search(url) and (thumbnail_id := url.split('_cat=', 1)[0]) not in thumbnail_ids:
+                        thumbnail_ids.add(thumbnail_id)
                         thumbnails.append({k: v for k, v in {
                             'url': url,
                             'height': (lambda x: int_or_none(x.group(1)) if x else None
-                                       )(re.search(r'stp=.+_[a-z]\d+x(\d+)&', url)),
+                                       )(self._THUMBNAIL_HEIGHT_RE.search(url)),
                             'preference': None if 'stp=' in url else 1,
                         }.items() if v is not None})
                 # timestamp
-                v_timestamp = traverse_obj(video, 'publish_time', 'creation_time', 'created_time', {int_or_none})
+                v_timestamp = video.get('publish_time') or video.get('creation_time') or video.get('created_time')
                 if not v_timestamp and v_id != video_id:
+                    id_re = re.compile(rf'id{Q}:\s*{Q}{v_id}{Q}')
                     for x in find_json_obj(post_data,
-                                           rf'creation_time{Q}:\s*\d+,', rf'created_time{Q}:\s*\d+,', rf'publish_time{Q}:\s*\d+,',
+                                           _json_re(r'creation_time{Q}:\s*\d+,', Q),
+                                           _json_re(r'created_time{Q}:\s*\d+,', Q),
+                                           _json_re(r'publish_time{Q}:\s*\d+,', Q),
                                            get_all=True):
-                        if re.search(rf'id{Q}:\s*{Q}{v_id}{Q}', x[1]):
-                            if v_timestamp := json.loads(x[1]).get(x[0].split(f'{Q}')[0]):
+                        if id_re.search(x[1]):
+                            if v_timestamp := parse_json_obj(x[1]).get(x[0].split(Q)[0]):
                                 break
                 # uploader
-                if uploader_id := traverse_obj(video, ('owner', 'id', {str_or_none})):
+                owner = traverse_obj(video, ('owner', {dict})) or {}
+                if uploader_id := str_or_none(owner.get('id')):
                     if x := list(find_json_obj(data, (
                             rf'id{Q}:\s*{Q}{uploader_id}{Q}[^}}]*{Q}name{Q}:\s*{Q}[^{Q}]',
                             rf'{Q}name{Q}:\s*{Q}[^{Q}][^}}]*{Q}id{Q}:\s*{Q}{uploader_id}{Q}'))):
                         if x[0][1]:
-                            video['owner'] = merge_dicts(video['owner'], json.loads(x[0][1]))
-                elif x := list(find_json_obj(data, (rf'(owner{Q}:)[^}}]*{Q}name{Q}:\s*{Q}[^{Q}]',
-                                                    rf'(_creator{Q}:)[^}}]*{Q}name{Q}:\s*{Q}[^{Q}]',
-                                                    rf'(actor{Q}:)[^}}]*{Q}name{Q}:\s*{Q}[^{Q}]'),
+                            video['owner'] = owner = merge_dicts(owner, parse_json_obj(x[0][1]))
+                elif x := list(find_json_obj(data, (_json_re(r'(owner{Q}:)[^}]*{Q}name{Q}:\s*{Q}[^{Q}]', Q),
+                                                    _json_re(r'(_creator{Q}:)[^}]*{Q}name{Q}:\s*{Q}[^{Q}]', Q),
+                                                    _json_re(r'(actor{Q}:)[^}]*{Q}name{Q}:\s*{Q}[^{Q}]', Q)),
                                              obj_in_value=True)):
                     if x[0][1]:
-                        video['owner'] = json.loads(x[0][1])
-                        uploader_id = traverse_obj(video, ('owner', 'id', {str_or_none}))
-                uploader = traverse_obj(video, ('owner', 'name', {str_or_none})) or extract_metadata('uploader')
+                        video['owner'] = owner = parse_json_obj(x[0][1])
+                        uploader_id = str_or_none(owner.get('id'))
+                uploader = str_or_none(owner.get('name')) or extract_metadata('uploader')
                 # description
                 v_desc = traverse_obj(video, ('savable_description', 'text', {str_or_none}))
                 if not v_desc and v_id != video_id:
@@ -870,14 +1083,14 @@ def parse_graphql_video(video):
                             (None, (..., 'video')), 'creation_story', 'id', {str_or_none}), get_all=False):
                         if x := list(find_json_obj(
                                 data, rf'{Q}message{Q}:(?:(?!{Q}message{Q}:)[^}}])+{Q}text{Q}:\s*{Q}[^{Q}](?:(?!{Q}id{Q}:).)+{Q}id{Q}:\s*{Q}{vs_id}{Q}')):
-                            v_desc = (lambda x: x if x != uploader else None)(json.loads(x[0][1])['message']['text'])
+                            v_desc = (lambda x: x if x != uploader else None)(parse_json_obj(x[0][1])['message']['text'])
                     else:
                         for x in find_json_obj(data, rf'video{Q}:\s*{{{Q}id{Q}:\s*{Q}{v_id}{Q}', get_all=True):
-                            if v_desc := traverse_obj(json.loads(x[1]), ('message', 'text', {str_or_none})):
+                            if v_desc := traverse_obj(parse_json_obj(x[1]), ('message', 'text', {str_or_none})):
                                 break
                 # title
                 if v_name := video.get('name'):
-                    v_title = v_name if len(v_name) <= 100 else v_name[:(47 + v_name[47:67].rfind(' '))] + '...'
+                    v_title = _truncate_string(v_name)
 
                 info = {
                     'id': v_id,
@@ -889,7 +1102,7 @@ def parse_graphql_video(video):
                     'timestamp': v_timestamp or extract_metadata('timestamp'),
                     'uploader': uploader,
                     'uploader_id': uploader_id or webpage_info.get('uploader_id'),
-                    'uploader_url': (traverse_obj(video, ('owner', 'url', {url_or_none}))
+                    'uploader_url': (url_or_none(owner.get('url'))
                                      or (webpage_info.get('uploader_url') if webpage_info.get('uploader') == uploader else None)
                                      or (lambda x: f'https://www.facebook.com/profile.php?id={x}' if x else None
                                          )(uploader_id or webpage_info.get('uploader_id'))),
@@ -902,14 +1115,16 @@ def parse_graphql_video(video):
                     'was_live': (video.get('broadcast_status') == 'VOD_READY'),
                     'concurrent_view_count': video.get('liveViewerCount'),
                 }
-                process_formats(info)
+                self._process_formats(info)
                 entries.append(info)
 
             entries, video_ids = [], []
             for idx, x in enumerate(find_json_obj(data,
-                                                  (rf'dash_manifest_url{Q}:\s*{Q}', rf'_hd_url{Q}:\s*{Q}', rf'_sd_url{Q}:\s*{Q}'),
+                                                  (_json_re(r'dash_manifest_url{Q}:\s*{Q}', Q),
+                                                   _json_re(r'_hd_url{Q}:\s*{Q}', Q),
+                                                   _json_re(r'_sd_url{Q}:\s*{Q}', Q)),
                                                   get_all=True)):
-                media = json.loads(x[1])
+                media = json.loads(x[1])    # not shared, since parse_graphql_video() modifies it
                 if (media.get('__typename', 'Video') == 'Video'
                         and not media.get('sticker_image')
                         and media.get('id', f'{video_id}_{idx}') not in video_ids):
@@ -923,41 +1138,27 @@ def parse_graphql_video(video):
                     k: v for k, v in extract_metadata().items() if v})
 
             video_info = entries[0] if entries else {'id': video_id}
-            video_info['title'] = re.sub(r'(?<!^Facebook)(\SFacebook)?(?: Facebook)? Video #\d{15,}$', r'\1', video_info.get('title'))
+            if ' Video #' in (video_info.get('title') or ''):     # fallback title
+                video_info['title'] = self._VIDEO_TITLE_ID_RE.sub(r'\1', video_info['title'])
             if webpage_info['thumbnails']:
+                # there are no thumbnails yet if no entry was built
+                thumbnails = video_info.setdefault('thumbnails', [])
                 if not (any(webpage_info['thumbnails'][0]['url'].split('_cat=')[0] in thumbnail['url']
-                            for thumbnail in video_info['thumbnails'])):
-                    video_info['thumbnails'].extend(webpage_info['thumbnails'])
+                            for thumbnail in thumbnails)):
+                    thumbnails.extend(webpage_info['thumbnails'])
             return merge_dicts(video_info, webpage_info)
 
         # if 'data' not found
         video_data = None
 
-        def extract_video_data(instances):
-            video_data = []
-            for item in instances:
-                if try_get(item, lambda x: x[1][0]) == 'VideoConfig':
-                    video_item = item[2][0]
-                    if video_item.get('video_id'):
-                        video_data.append(video_item['videoData'])
-            return video_data
-
-        def extract_from_jsmods_instances(js_data):
-            if js_data:
-                return extract_video_data(try_get(
-                    js_data, lambda x: x['jsmods']['instances'], list) or [])
-
         if server_js_data := self._parse_json(self._search_regex(
-                [r'handleServerJS\(({.+})(?:\);|,")', r'\bs\.handle\(({.+?})\);'],
-                webpage, 'server js data', default='{}'), video_id, fatal=False):
-            video_data = extract_video_data(server_js_data.get('instances', []))
+                self._SERVER_JS_RE, webpage, 'server js data', default='{}'), video_id, fatal=False):
+            video_data = self._extract_video_data(server_js_data.get('instances', []))
 
         if not video_data:
-            if server_js_data := self._parse_json(self._search_regex([
-                r'bigPipe\.onPageletArrive\(({.+?})\)\s*;\s*}\s*\)\s*,\s*["\']onPageletArrive\s+' + self._SUPPORTED_PAGLETS_REGEX,
-                rf'bigPipe\.onPageletArrive\(({{.*?id\s*:\s*"{self._SUPPORTED_PAGLETS_REGEX}".*?}})\);',
-            ], webpage, 'js data', default='{}'), video_id, js_to_json, False):
-                video_data = extract_from_jsmods_instances(server_js_data)
+            if server_js_data := self._parse_json(self._search_regex(
+                    self._PAGELET_RE, webpage, 'js data', default='{}'), video_id, js_to_json, False):
+                video_data = self._extract_from_jsmods_instances(server_js_data)
 
         if not video_data and False:    # skipped because not working
             # Video info not in first request, do a secondary request using
@@ -969,28 +1170,22 @@ def extract_from_jsmods_instances(js_data):
                 data=urlencode_postdata({
                     '__a': 1,
                     '__pc': self._search_regex(
-                        r'pkg_cohort["\']\s*:\s*["\'](.+?)["\']', webpage,
-                        'pkg cohort', default='PHASED:DEFAULT'),
+                        self._PKG_COHORT_RE, webpage, 'pkg cohort', default='PHASED:DEFAULT'),
                     '__rev': self._search_regex(
-                        r'client_revision["\']\s*:\s*(\d+),', webpage,
-                        'client revision', default='3944515'),
+                        self._CLIENT_REVISION_RE, webpage, 'client revision', default='3944515'),
                     'fb_dtsg': self._search_regex(
-                        r'"DTSGInitialData"\s*,\s*\[\]\s*,\s*{\s*"token"\s*:\s*"([^"]+)"',
-                        webpage, 'dtsg token', default=''),
+                        self._DTSG_TOKEN_RE, webpage, 'dtsg token', default=''),
                 }),
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                })
+                headers=self._FORM_HEADERS)
             if tahoe_data:
                 tahoe_js_data = self._parse_json(
                     self._search_regex(
-                        r'for\s+\(\s*;\s*;\s*\)\s*;(.+)', tahoe_data,
-                        'tahoe js data', default='{}'),
+                        self._TAHOE_JS_RE, tahoe_data, 'tahoe js data', default='{}'),
                     video_id, fatal=False)
-                video_data = extract_from_jsmods_instances(tahoe_js_data)
+                video_data = self._extract_from_jsmods_instances(tahoe_js_data)
 
         if not video_data:
-            m_msg = re.search(r'class="[^"]*uiInterstitialContent[^"]*"><div>(.*?)</div>', webpage)
+            m_msg = self._INTERSTITIAL_RE.search(webpage)
             if m_msg is not None:
                 raise ExtractorError(
                     f'The video is not available, Facebook said: "{m_msg.group(1)}"',
@@ -1041,7 +1236,7 @@ def extract_from_jsmods_instances(js_data):
                             'quality': preference,
                             'height': 720 if quality == 'hd' else None,
                         })
-            formats, subtitles = extract_dash_manifest(f[0], formats, subtitles)
+            formats, subtitles = self._extract_dash_manifest(f[0], formats, subtitles)
             subtitles_src = f[0].get('subtitles_src')
             if subtitles_src:
                 subtitles.setdefault('en', []).append({'url': subtitles_src})
@@ -1051,7 +1246,7 @@ def extract_from_jsmods_instances(js_data):
             'formats': formats,
             'subtitles': subtitles,
         }
-        process_formats(info_dict)
+        self._process_formats(info_dict)
         info_dict.update(webpage_info)
 
         return info_dict
@@ -1210,29 +1405,51 @@ class FacebookAdsIE(InfoExtractor):
         'watermarked_video_hd_url': ('hd-wmk', 'HD, watermarked'),
         'video_hd_url': ('hd', None),
     }
+    _JSON_DECODER = json.JSONDecoder(strict=False)  # as lenient as _parse_json about control characters
 
     def _extract_formats(self, video_dict):
         formats = []
-        for format_key, format_url in traverse_obj(video_dict, (
-            {dict.items}, lambda _, v: v[0] in self._FORMATS_MAP and url_or_none(v[1]),
-        )):
+        for quality, (format_key, (format_id, format_note)) in enumerate(self._FORMATS_MAP.items()):
+            format_url = url_or_none(video_dict.get(format_key))
+            if not format_url:
+                continue
             formats.append({
-                'format_id': self._FORMATS_MAP[format_key][0],
-                'format_note': self._FORMATS_MAP[format_key][1],
+                'format_id': format_id,
+                'format_note': format_note,
                 'url': format_url,
                 'ext': 'mp4',
-                'quality': qualities(tuple(self._FORMATS_MAP))(format_key),
+                'quality': quality,
             })
         return formats
 
+    @classmethod
+    def _yield_handle_json(cls, webpage):
+        # the decoder knows where each object ends, so the blobs are parsed without matching them first
+        start = webpage.find('s.handle({')
+        while start != -1:
+            start += len('s.handle(')
+            try:
+                obj, end = cls._JSON_DECODER.raw_decode(webpage, start)
+            except json.JSONDecodeError:
+                end = start
+            else:
+                if webpage.startswith(');requireLazy(', end):
+                    yield obj
+            start = webpage.find('s.handle({', end)
+
+    @staticmethod
+    def _find_snapshot(post_data):
+        # each blob is traversed on its own, so that the blobs after the first match are not walked
+        for blob in post_data:
+            if snapshot := traverse_obj(blob, (
+                    'require', ..., ..., ..., 'props', 'deeplinkAdCard', 'snapshot', {dict}), get_all=False):
+                return snapshot
+
     def _real_extract(self, url):
         video_id = self._match_id(url)
         webpage = self._download_webpage(url, video_id)
 
-        post_data = [self._parse_json(j, video_id, fatal=False)
-                     for j in re.findall(r's\.handle\(({.*})\);requireLazy\(', webpage)]
-        data = traverse_obj(post_data, (
-            ..., 'require', ..., ..., ..., 'props', 'deeplinkAdCard', 'snapshot', {dict}), get_all=False)
+        data = self._find_snapshot(self._yield_handle_json(webpage))
         if not data:
             raise ExtractorError('Unable to extract ad data')
 
@@ -1250,15 +1467,17 @@ def _real_extract(self, url):
         })
 
         entries = []
-        for idx, entry in enumerate(traverse_obj(
-            data, (('videos', 'cards'), lambda _, v: any(url_or_none(v[f]) for f in self._FORMATS_MAP))), 1,
-        ):
+        description = info_dict.get('description')
+        for entry in traverse_obj(data, (('videos', 'cards'), ..., {dict})):
+            formats = self._extract_formats(entry)
+            if not formats:
+                continue
             entries.append({
-                'id': f'{video_id}_{idx}',
+                'id': f'{video_id}_{len(entries) + 1}',
                 'title': entry.get('title') or title,
-                'description': entry.get('link_description') or info_dict.get('description'),
+                'description': entry.get('link_description') or description,
                 'thumbnail': url_or_none(entry.get('video_preview_image_url')),
-                'formats': self._extract_formats(entry),
+                'formats': formats,
             })
 
         if len(entries) == 1: